@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Build the RedisLess cffi bindings in API mode. The compiled `_redisless_cffi` module calls
+libredisless directly instead of going through libffi on each call.
+
+Run `python build_ffi.py` once libredisless has been copied next to this file. On Windows, the
+compiled module finds libredisless through the DLL search path instead of next to itself.
+"""
+from os.path import dirname, abspath
+from sys import platform
+
+from cffi import FFI
+
+from redisless import C_DEF
+
+source_path = dirname(abspath(__file__))
+
+# find libredisless next to the compiled module at runtime
+extra_link_args = []
+if platform.startswith('linux'):
+    extra_link_args = ['-Wl,-rpath,$ORIGIN']
+elif platform.startswith('darwin'):
+    extra_link_args = ['-Wl,-rpath,@loader_path']
+
+ffibuilder = FFI()
+ffibuilder.cdef(C_DEF)
+ffibuilder.set_source(
+    '_redisless_cffi',
+    '#include <stdbool.h>\n#include <stddef.h>\n{}'.format(C_DEF),
+    libraries=['redisless'],
+    library_dirs=[source_path],
+    extra_link_args=extra_link_args,
+)
+
+if __name__ == '__main__':
+    ffibuilder.compile(tmpdir=source_path, verbose=True)
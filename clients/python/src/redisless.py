@@ -1,61 +1,264 @@
-from os.path import dirname, abspath
+import struct
+from functools import lru_cache
+from os.path import dirname, abspath, join
 from sys import platform
+from typing import Any, List, Optional, Sequence, Tuple
 
 from cffi import FFI
 
+C_DEF = """
+    // opaque pointer to Server struct
+    typedef void* server;
 
-class RedisLess(object):
+    server redisless_server_new(unsigned short);
+    void redisless_server_free(void* server);
+    bool redisless_server_start(void* server);
+    bool redisless_server_stop(void* server);
+    size_t redisless_server_exec(void* server, const char* commands, size_t commands_length, char** reply);
+    size_t redisless_server_call(void* server, unsigned short opcode, const char* payload, size_t payload_length,
+                                 char** reply);
+    void redisless_reply_free(char* reply, size_t reply_length);
+"""
+
+# the Windows lib has no Unix domain socket support - the compiled bindings would not link
+if not platform.startswith('win32'):
+    C_DEF += """
+    server redisless_server_new_unix(const char* path);
+"""
+
+# opcodes of the binary framed commands run by RedisLess.call()
+OPCODE_GET = 0x0000
+OPCODE_SET = 0x0001
+OPCODE_DEL = 0x0002
+OPCODE_EXISTS = 0x0003
+OPCODE_INCR = 0x0004
+OPCODE_DECR = 0x0005
+OPCODE_PING = 0x0006
+
+# support Windows / Linux and MacOSX - resolve the right lib once
+_LIB_EXTENSION = None
+if platform.startswith('linux'):
+    _LIB_EXTENSION = 'so'
+elif platform.startswith('darwin'):
+    _LIB_EXTENSION = 'dylib'
+elif platform.startswith('win32'):
+    _LIB_EXTENSION = 'dll'
+
+_LIB_PATH = join(dirname(abspath(__file__)), 'libredisless.{}'.format(_LIB_EXTENSION))
+
+
+class RedisLessError(Exception):
     """
-    RedisLess is a fast, lightweight, embedded and scalable in-memory Key/Value store library
-    compatible with the Redis API.
+    Error returned by RedisLess when running a command
     """
 
-    def __init__(self, port: int = 16379):
-        ffi = FFI()
 
-        c_def = """
-            // opaque pointer to Server struct
-            typedef void* server;
-            
-            server redisless_server_new(unsigned short);
-            void redisless_server_free(void* server);
-            bool redisless_server_start(void* server);
-            bool redisless_server_stop(void* server);
-        """
+@lru_cache(maxsize=None)
+def _load_lib():
+    """
+    Parse the C definitions and load the RedisLess lib only once per process
+    :return: the (ffi, lib) tuple shared by all RedisLess instances
+    """
+    try:
+        # API mode - use the compiled bindings when they have been built with build_ffi.py
+        from _redisless_cffi import ffi, lib
+        return ffi, lib
+    except ImportError:
+        pass
+
+    # ABI mode - fallback on loading the lib at runtime
+    if _LIB_EXTENSION is None:
+        print('platform {} not supported'.format(platform))
+        exit(1)
+
+    ffi = FFI()
+    ffi.cdef(C_DEF)
+    return ffi, ffi.dlopen(_LIB_PATH)
 
-        # ffi.set_source("c.binding", c_def)
-        # ffi.compile(verbose=True)
 
-        ffi.cdef(c_def)
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return str(value).encode('utf-8')
 
-        # support Windows / Linux and MacOSX - load the right lib
-        lib_extension = None
-        if platform.startswith('linux'):
-            lib_extension = 'so'
-        elif platform.startswith('darwin'):
-            lib_extension = 'dylib'
+
+def _encode_commands(commands: Sequence[Tuple[Any, ...]]) -> bytes:
+    """
+    Encode commands into RESP arrays of bulk strings
+    """
+    chunks = []
+    for command in commands:
+        chunks.append(b'*%d\r\n' % len(command))
+        for arg in command:
+            arg = _to_bytes(arg)
+            chunks.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+
+    return b''.join(chunks)
+
+
+def _parse_reply(reply: bytes, pos: int) -> Tuple[Any, int]:
+    """
+    Parse the RESP value starting at `pos`
+    :return: the parsed value and the position right after it
+    """
+    end = reply.index(b'\r\n', pos)
+    symbol, line, pos = reply[pos:pos + 1], reply[pos + 1:end], end + 2
+
+    if symbol == b'+':
+        return line, pos
+    if symbol == b'-':
+        return RedisLessError(line.decode('utf-8')), pos
+    if symbol == b':':
+        return int(line), pos
+    if symbol == b'$':
+        size = int(line)
+        if size < 0:
+            return None, pos
+        return reply[pos:pos + size], pos + size + 2
+    if symbol == b'*':
+        values = []
+        for _ in range(int(line)):
+            value, pos = _parse_reply(reply, pos)
+            values.append(value)
+        return values, pos
+
+    raise RedisLessError('unknown reply type {}'.format(symbol))
+
+
+class RedisLess(object):
+    """
+    RedisLess is a fast, lightweight, embedded and scalable in-memory Key/Value store library
+    compatible with the Redis API.
+    """
+
+    def __init__(self, port: int = 16379, unix_socket_path: Optional[str] = None):
+        """
+        :param port: TCP port to listen on
+        :param unix_socket_path: listen on this Unix domain socket instead of the TCP port (not supported on Windows)
+        """
+        self._ffi, self._C = _load_lib()
+        self._started = False
+        if unix_socket_path is None:
+            # ffi.cast() silently truncates out of range values
+            if not 0 <= port <= 0xFFFF:
+                raise ValueError('invalid port {}'.format(port))
+            self._port = self._ffi.cast('unsigned short', port)
+            self._redisless_server = self._C.redisless_server_new(self._port)
         elif platform.startswith('win32'):
-            lib_extension = 'dll'
+            raise RedisLessError('unix sockets are not supported on {}'.format(platform))
         else:
-            print('platform {} not supported'.format(platform))
-            exit(1)
+            self._redisless_server = self._C.redisless_server_new_unix(unix_socket_path.encode('utf-8'))
+            if self._redisless_server == self._ffi.NULL:
+                raise RedisLessError('invalid unix socket path {}'.format(unix_socket_path))
+
+    def __del__(self):
+        self.free()
 
-        source_path = dirname(abspath(__file__))
-        self._C = ffi.dlopen("{}/libredisless.{}".format(source_path, lib_extension))
-        self._redisless_server = self._C.redisless_server_new(port)
+    def __enter__(self) -> 'RedisLess':
+        if not self.start():
+            raise RedisLessError('RedisLess instance has not been started')
+        return self
 
-    # TODO implement destructor and free redisless
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+        self.free()
+
+    def free(self) -> None:
+        """
+        Stop and free local embedded RedisLess instance and its data - the instance can't be used afterwards
+        """
+        # __init__ may have failed before creating the instance
+        redisless_server = getattr(self, '_redisless_server', None)
+        if redisless_server is not None:
+            if self._started:
+                self.stop()
+            self._C.redisless_server_free(redisless_server)
+            self._redisless_server = None
 
     def start(self) -> bool:
         """
         Start local embedded RedisLess instance
         :return: true if RedisLess instance has been started correctly; false otherwise
         """
-        return self._C.redisless_server_start(self._redisless_server)
+        started = self._C.redisless_server_start(self._server())
+        self._started = self._started or started
+        return started
 
     def stop(self) -> bool:
         """
         Stop local embedded RedisLess instance
         :return: true if RedisLess instance has been stopped correctly; false otherwise
         """
-        return self._C.redisless_server_stop(self._redisless_server)
+        stopped = self._C.redisless_server_stop(self._server())
+        self._started = self._started and not stopped
+        return stopped
+
+    def exec_many(self, commands: Sequence[Tuple[Any, ...]]) -> List[Any]:
+        """
+        Run commands on the local embedded RedisLess instance with a single call, without going through the network
+        :param commands: commands to run, e.g. [('SET', 'key', 'value'), ('GET', 'key')]
+        :return: the reply of each command
+        """
+        payload = _encode_commands(commands)
+        reply = self._ffi.new('char**')
+        reply_length = self._C.redisless_server_exec(self._server(), payload, len(payload), reply)
+        return self._read_replies(reply, reply_length)
+
+    def call(self, opcode: int, key: Any = None, value: Any = None) -> Any:
+        """
+        Run a binary framed command on the local embedded RedisLess instance, without going through the network nor
+        encoding the command in RESP
+        :param opcode: one of the OPCODE_* constants
+        :param key: key of the command, if it takes one
+        :param value: value of the command, if it takes one
+        :return: the reply of the command
+        """
+        payload = b''
+        if key is not None:
+            key = _to_bytes(key)
+            payload += struct.pack('<H', len(key)) + key
+        if value is not None:
+            value = _to_bytes(value)
+            payload += struct.pack('<I', len(value)) + value
+
+        reply = self._ffi.new('char**')
+        reply_length = self._C.redisless_server_call(self._server(), opcode, payload, len(payload), reply)
+        return self._read_replies(reply, reply_length)[0]
+
+    def _server(self) -> Any:
+        if self._redisless_server is None:
+            raise RedisLessError('RedisLess instance has been freed')
+        return self._redisless_server
+
+    def _read_replies(self, reply_buffer: Any, reply_length: int) -> List[Any]:
+        # each call gets its own buffer from the lib - copy it then release it
+        try:
+            reply = self._ffi.buffer(reply_buffer[0], reply_length)[:]
+        finally:
+            self._C.redisless_reply_free(reply_buffer[0], reply_length)
+
+        replies = []
+        pos = 0
+        while pos < reply_length:
+            value, pos = _parse_reply(reply, pos)
+            if isinstance(value, RedisLessError):
+                raise value
+            replies.append(value)
+
+        return replies
+
+    def set(self, key: Any, value: Any) -> bool:
+        """
+        Set the value of a key on the local embedded RedisLess instance, without going through the network
+        :return: true if the value has been set; false otherwise
+        """
+        return self.call(OPCODE_SET, key, value) == b'OK'
+
+    def get(self, key: Any) -> Optional[bytes]:
+        """
+        Get the value of a key on the local embedded RedisLess instance, without going through the network
+        :return: the value of the key; None if the key does not exist
+        """
+        return self.call(OPCODE_GET, key)
@@ -0,0 +1,123 @@
+import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
+from platform import python_implementation
+
+import pytest
+import redis
+
+from redisless import RedisLess, RedisLessError, OPCODE_DEL
+
+UNIX_SOCKET_PATH = '/tmp/redisless.sock'
+
+
+@pytest.fixture(scope='module')
+def redisless():
+    # all the scenarios share the same embedded instance
+    with RedisLess(unix_socket_path=UNIX_SOCKET_PATH) as redisless:
+        yield redisless
+
+
+@pytest.fixture(scope='module')
+def client(redisless):
+    # hiredis is a CPython extension - on PyPy the JIT compiles the pure Python parser instead
+    parser_class = redis.connection.PythonParser
+    if python_implementation() == 'CPython':
+        parser_class = redis.connection.HiredisParser
+
+    # reuse the same connections for all the iterations - a Unix domain socket skips the TCP/IP stack
+    pool = redis.BlockingConnectionPool(connection_class=redis.UnixDomainSocketConnection, path=UNIX_SOCKET_PATH,
+                                        max_connections=16, parser_class=parser_class)
+    yield redis.Redis(connection_pool=pool)
+    pool.disconnect()
+
+
+def test_pipelined_commands(client, record_property):
+    iterations = 20
+    results = []
+
+    # skip the objects allocated so far in future collections and don't collect while looping
+    if hasattr(gc, 'freeze'):  # CPython only
+        gc.freeze()
+    gc.disable()
+
+    try:
+        start = time.perf_counter_ns()
+
+        for _ in range(iterations):
+            # send all the commands of an iteration in a single round-trip
+            pipe = client.pipeline(transaction=False)
+            pipe.ping()
+            pipe.set('n', 8)
+            pipe.incr('n')
+            pipe.decr('n')
+            pipe.set('key', 'value')
+            pipe.get('key')
+            pipe.type('key')
+            pipe.get('key2')
+            pipe.get('not existing key')
+            pipe.delete('key')
+            results.append(pipe.execute())
+
+        elapsed = time.perf_counter_ns() - start
+    finally:
+        gc.enable()
+        if hasattr(gc, 'unfreeze'):
+            gc.unfreeze()
+        gc.collect()
+
+    # reported in the junit XML report
+    record_property('elapsed_us', elapsed // 1000)
+
+    # check the replies once the loop is done to keep assertions out of it
+    assert results == [[True, True, 9, 8, True, b'value', b'string', None, None, 1]] * iterations
+
+
+def test_exec_many(redisless):
+    # run commands on the embedded instance without going through the network
+    replies = redisless.exec_many([('SET', 'exec key', 'value'), ('GET', 'exec key'), ('DEL', 'exec key')])
+    assert replies == [b'OK', b'value', 1]
+
+
+def test_set_get(redisless):
+    assert redisless.set('embedded key', 'value')
+    assert redisless.get('embedded key') == b'value'
+    assert redisless.call(OPCODE_DEL, 'embedded key') == 1
+    assert redisless.get('embedded key') is None
+
+
+def test_binary_value(redisless):
+    value = b'a\r\nb\x00\xff'
+    assert redisless.set('binary key', value)
+    assert redisless.get('binary key') == value
+    assert redisless.call(OPCODE_DEL, 'binary key') == 1
+
+
+def test_large_value(redisless):
+    value = b'v' * (1 << 20)
+    assert redisless.set('large key', value)
+    assert redisless.get('large key') == value
+    assert redisless.exec_many([('GET', 'large key'), ('DEL', 'large key')]) == [value, 1]
+
+
+def test_concurrent_calls(redisless):
+    def set_get(thread_id):
+        key = 'thread key {}'.format(thread_id)
+        for i in range(500):
+            value = '{} {}'.format(key, i).encode('utf-8')
+            assert redisless.set(key, value)
+            assert redisless.get(key) == value
+
+    # each thread must get the replies of its own calls
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(set_get, range(8)))
+
+
+def test_freed_instance():
+    redisless = RedisLess(port=16380)
+    redisless.free()
+
+    with pytest.raises(RedisLessError):
+        redisless.start()
+    with pytest.raises(RedisLessError):
+        redisless.get('key')
@@ -23,9 +23,9 @@ fn criterion_benchmarks(c: &mut Criterion) {
 
             // run command `GET mykey`
             let _ = stream.write(b"*2\r\n$3\r\nGET\r\n$5\r\nmykey\r\n");
-            let mut get_res = [0; 8];
+            let mut get_res = [0; 11];
             let _ = stream.read(&mut get_res);
-            assert_eq!(get_res, b"+value\r\n"[..]);
+            assert_eq!(get_res, b"$5\r\nvalue\r\n"[..]);
 
             // run command `DEL mykey`
             let _ = stream.write(b"*2\r\n$3\r\nDEL\r\n$5\r\nmykey\r\n");
@@ -27,6 +27,8 @@ pub enum RedisCommandError {
     NoSuchKey,
     IndexOutOfRange,
     SyntaxErr,
+    // Value is not an integer or incrementing it overflows
+    NotAnInteger,
 }
 
 impl RedisCommandError {
@@ -57,6 +59,7 @@ impl Display for RedisCommandError {
             Self::NoSuchKey => write!(f, "no such key"),
             Self::IndexOutOfRange => write!(f, "index out of range"),
             Self::SyntaxErr => write!(f, "systax error"),
+            Self::NotAnInteger => write!(f, "ERR value is not an integer or out of range"),
         }
     }
 }
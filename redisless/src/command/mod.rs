@@ -2,6 +2,7 @@
 mod tests;
 
 pub mod command_error;
+pub mod opcode;
 mod util;
 
 use std::collections::HashSet;
@@ -0,0 +1,83 @@
+// Binary framing of the commands sent by embedded clients through `redisless_server_call`.
+// A command is a `u16` opcode and a payload made of a key prefixed by its `u16` length,
+// followed (for commands taking a value) by a value prefixed by its `u32` length.
+// Lengths are little endian.
+use super::command_error::RedisCommandError;
+use super::{Command, Key, Value};
+
+pub const GET: u16 = 0x0000;
+pub const SET: u16 = 0x0001;
+pub const DEL: u16 = 0x0002;
+pub const EXISTS: u16 = 0x0003;
+pub const INCR: u16 = 0x0004;
+pub const DECR: u16 = 0x0005;
+pub const PING: u16 = 0x0006;
+
+impl Command {
+    pub fn from_opcode(opcode: u16, payload: &[u8]) -> Result<Self, RedisCommandError> {
+        use Command::*;
+
+        let mut payload = payload;
+        let command = match opcode {
+            GET => Get(read_key(&mut payload)?),
+            SET => {
+                let key = read_key(&mut payload)?;
+                let value = read_value(&mut payload)?;
+                Set(key, value)
+            }
+            DEL => Del(read_key(&mut payload)?),
+            EXISTS => Exists(read_key(&mut payload)?),
+            INCR => Incr(read_key(&mut payload)?),
+            DECR => IncrBy(read_key(&mut payload)?, -1),
+            PING => Ping,
+            unsupported_opcode => {
+                return Err(RedisCommandError::NotSupported(format!(
+                    "{:#06x}",
+                    unsupported_opcode
+                )))
+            }
+        };
+
+        if payload.is_empty() {
+            Ok(command)
+        } else {
+            Err(RedisCommandError::ArgNumber)
+        }
+    }
+}
+
+fn read_key(payload: &mut &[u8]) -> Result<Key, RedisCommandError> {
+    match payload.get(..2) {
+        Some(length) => {
+            let length = u16::from_le_bytes([length[0], length[1]]) as usize;
+            read_bytes(payload, 2, length)
+        }
+        None => Err(RedisCommandError::InvalidCommand),
+    }
+}
+
+fn read_value(payload: &mut &[u8]) -> Result<Value, RedisCommandError> {
+    match payload.get(..4) {
+        Some(length) => {
+            let length = u32::from_le_bytes([length[0], length[1], length[2], length[3]]) as usize;
+            read_bytes(payload, 4, length)
+        }
+        None => Err(RedisCommandError::InvalidCommand),
+    }
+}
+
+/// move `payload` past the length prefix and the `length` bytes following it
+fn read_bytes(
+    payload: &mut &[u8],
+    prefix_length: usize,
+    length: usize,
+) -> Result<Vec<u8>, RedisCommandError> {
+    match payload.get(prefix_length..prefix_length + length) {
+        Some(bytes) => {
+            let bytes = bytes.to_vec();
+            *payload = &payload[prefix_length + length..];
+            Ok(bytes)
+        }
+        None => Err(RedisCommandError::InvalidCommand),
+    }
+}
@@ -1,4 +1,4 @@
-use crate::command::Command;
+use crate::command::{command_error::RedisCommandError, opcode, Command};
 use crate::protocol::Resp;
 
 #[test]
@@ -15,3 +15,24 @@ fn set_command() {
         assert_eq!(command, Command::Set(b"mykey".to_vec(), b"value".to_vec()));
     }
 }
+
+#[test]
+fn opcode_commands() {
+    let command = Command::from_opcode(opcode::SET, b"\x05\x00mykey\x05\x00\x00\x00value").unwrap();
+    assert_eq!(command, Command::Set(b"mykey".to_vec(), b"value".to_vec()));
+
+    let command = Command::from_opcode(opcode::GET, b"\x05\x00mykey").unwrap();
+    assert_eq!(command, Command::Get(b"mykey".to_vec()));
+
+    let command = Command::from_opcode(opcode::PING, b"").unwrap();
+    assert_eq!(command, Command::Ping);
+
+    let err = Command::from_opcode(opcode::GET, b"\x09\x00mykey").unwrap_err();
+    assert!(matches!(err, RedisCommandError::InvalidCommand));
+
+    let err = Command::from_opcode(opcode::PING, b"mykey").unwrap_err();
+    assert!(matches!(err, RedisCommandError::ArgNumber));
+
+    let err = Command::from_opcode(0xffff, b"").unwrap_err();
+    assert!(matches!(err, RedisCommandError::NotSupported(_)));
+}
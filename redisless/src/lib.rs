@@ -2,6 +2,8 @@
 #[macro_use]
 extern crate serial_test;
 
+use std::panic::{self, AssertUnwindSafe};
+
 use storage::in_memory::InMemoryStorage;
 
 use crate::server::{Server, ServerState};
@@ -21,8 +23,29 @@ pub unsafe extern "C" fn redisless_server_new(port: u16) -> *mut Server {
     Box::into_raw(Box::new(Server::new(InMemoryStorage::new(), port)))
 }
 
+/// Create a server listening on the Unix domain socket `path` instead of a TCP port.
+/// Return a null pointer if `path` is not a valid UTF-8 string.
+#[cfg(unix)]
+#[no_mangle]
+pub unsafe extern "C" fn redisless_server_new_unix(
+    path: *const std::os::raw::c_char,
+) -> *mut Server {
+    if path.is_null() {
+        return std::ptr::null_mut();
+    }
+
+    match std::ffi::CStr::from_ptr(path).to_str() {
+        Ok(path) => Box::into_raw(Box::new(Server::new_unix(InMemoryStorage::new(), path))),
+        Err(_) => std::ptr::null_mut(),
+    }
+}
+
 #[no_mangle]
 pub unsafe extern "C" fn redisless_server_free(server: *mut Server) {
+    if server.is_null() {
+        return;
+    }
+
     let _ = Box::from_raw(server);
 }
 
@@ -51,3 +74,74 @@ pub unsafe extern "C" fn redisless_server_stop(server: *mut Server) -> bool {
         None => false,
     }
 }
+
+/// Run RESP encoded `commands` on the embedded server without going through the network.
+/// `*reply` is set to a buffer holding the replies and their length is returned - the buffer
+/// must be released with `redisless_reply_free`.
+#[no_mangle]
+pub unsafe extern "C" fn redisless_server_exec(
+    server: *mut Server,
+    commands: *const u8,
+    commands_length: usize,
+    reply: *mut *mut u8,
+) -> usize {
+    let server = match server.as_ref() {
+        Some(server) => server,
+        None => return 0,
+    };
+
+    if commands.is_null() || reply.is_null() {
+        return 0;
+    }
+
+    let commands = std::slice::from_raw_parts(commands, commands_length);
+    let res = reply_or_error(|| server.exec(commands));
+    into_reply(res, reply)
+}
+
+/// Run a binary framed command (see `command::opcode`) on the embedded server without going
+/// through the network nor parsing RESP. The reply is returned like `redisless_server_exec`.
+#[no_mangle]
+pub unsafe extern "C" fn redisless_server_call(
+    server: *mut Server,
+    opcode: u16,
+    payload: *const u8,
+    payload_length: usize,
+    reply: *mut *mut u8,
+) -> usize {
+    let server = match server.as_ref() {
+        Some(server) => server,
+        None => return 0,
+    };
+
+    if payload.is_null() || reply.is_null() {
+        return 0;
+    }
+
+    let payload = std::slice::from_raw_parts(payload, payload_length);
+    let res = reply_or_error(|| server.call(opcode, payload));
+    into_reply(res, reply)
+}
+
+/// reply with an error instead of unwinding across the C ABI when running a command panics
+fn reply_or_error<F: FnOnce() -> Vec<u8>>(run: F) -> Vec<u8> {
+    panic::catch_unwind(AssertUnwindSafe(run))
+        .unwrap_or_else(|_| b"-ERR internal error\r\n".to_vec())
+}
+
+unsafe fn into_reply(res: Vec<u8>, reply: *mut *mut u8) -> usize {
+    let res = res.into_boxed_slice();
+    let reply_length = res.len();
+    *reply = Box::into_raw(res) as *mut u8;
+    reply_length
+}
+
+/// Release a buffer returned by `redisless_server_exec` or `redisless_server_call`.
+#[no_mangle]
+pub unsafe extern "C" fn redisless_reply_free(reply: *mut u8, reply_length: usize) {
+    if reply.is_null() {
+        return;
+    }
+
+    let _ = Box::from_raw(std::slice::from_raw_parts_mut(reply, reply_length));
+}
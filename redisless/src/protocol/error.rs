@@ -38,11 +38,19 @@ impl RedisError {
             err_type: RedisErrorType::IncorrectFormat,
         }
     }
+
+    /// the input is the beginning of a RESP value - the rest of it has not been received yet
+    pub fn is_incomplete(&self) -> bool {
+        matches!(
+            self.err_type,
+            RedisErrorType::EmptyInput | RedisErrorType::NoCrlf
+        )
+    }
 }
 
 impl<'a> std::fmt::Display for RedisError {
     fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
-        write!(f, "{}", self)
+        write!(f, "{:?}", self.err_type)
     }
 }
 
@@ -59,6 +59,9 @@ impl RedisProtocolParser {
                     Resp::BulkString(&input_after_size[..size]),
                     &input_after_size[size + 2..],
                 ))
+            } else if RedisProtocolParser::check_truncated_at_index(input_after_size, size) {
+                // the end of the string has not been received yet
+                Err(RedisError::no_crlf())
             } else {
                 Err(RedisError::incorrect_format())
             }
@@ -66,7 +69,18 @@ impl RedisProtocolParser {
     }
 
     fn check_crlf_at_index(input: &[u8], index: usize) -> bool {
-        input.len() >= index && input[index] == CR && input[index + 1] == LF
+        // the index comes from the client - don't let it overflow
+        match index.checked_add(2) {
+            Some(end) if end <= input.len() => input[index] == CR && input[index + 1] == LF,
+            _ => false,
+        }
+    }
+
+    fn check_truncated_at_index(input: &[u8], index: usize) -> bool {
+        match index.checked_add(2) {
+            Some(end) if end > input.len() => input.get(index).map_or(true, |x| *x == CR),
+            _ => false,
+        }
     }
 
     fn check_null_value(input: &[u8]) -> bool {
@@ -78,7 +92,8 @@ impl RedisProtocolParser {
         let size = std::str::from_utf8(size_str)?.parse::<u64>()?;
         let sizes = size as usize;
         let mut left = input;
-        let mut result = Vec::with_capacity(sizes);
+        // each element takes at least one byte - don't preallocate more than the input can hold
+        let mut result = Vec::with_capacity(sizes.min(input.len()));
         for _ in 0..sizes {
             let (element, tmp) = RedisProtocolParser::parse(left)?;
             result.push(element);
@@ -52,6 +52,35 @@ pub fn test_bulk_string() -> std::result::Result<(), RedisError> {
     Ok(())
 }
 
+#[test]
+pub fn test_incomplete_input() {
+    for input in &[
+        "",
+        "*2\r\n$3\r\nfoo\r\n",
+        "*1\r\n$3\r\nfo",
+        "*1\r\n$3\r\nfoo\r",
+        "+hel",
+    ] {
+        match RedisProtocolParser::parse(input.as_bytes()) {
+            Err(err) => assert!(err.is_incomplete(), "{:?}", input),
+            Ok(_) => panic!("{:?} is not complete", input),
+        }
+    }
+
+    let input = "$4\r\nfoo\r\n".as_bytes();
+    assert!(!RedisProtocolParser::parse(input)
+        .unwrap_err()
+        .is_incomplete());
+}
+
+#[test]
+pub fn test_oversized_lengths() {
+    let input = "$18446744073709551615\r\nfoo\r\n".as_bytes();
+    assert!(RedisProtocolParser::parse(input).is_err());
+    let input = "*18446744073709551615\r\n$3\r\nfoo\r\n".as_bytes();
+    assert!(RedisProtocolParser::parse(input).is_err());
+}
+
 #[test]
 pub fn test_arrays() -> std::result::Result<(), RedisError> {
     let input = "*2\r\n$3\r\nfoo\r\n$3\r\nbar\r\n".as_bytes();
@@ -1,8 +1,14 @@
-use std::io::ErrorKind;
-use std::net::{IpAddr, Ipv4Addr, SocketAddr, TcpListener, TcpStream};
+use std::io::{ErrorKind, Read, Write};
+use std::net::{IpAddr, Ipv4Addr, SocketAddr, TcpListener};
+#[cfg(unix)]
+use std::os::unix::fs::FileTypeExt;
+#[cfg(unix)]
+use std::os::unix::net::{UnixListener, UnixStream};
+#[cfg(unix)]
+use std::path::{Path, PathBuf};
 use std::sync::{Arc, Mutex};
-use std::thread;
-use std::time::{Duration, SystemTime};
+use std::thread::{self, JoinHandle};
+use std::time::Duration;
 
 use crossbeam_channel::{Receiver, Sender};
 use mpb::MPB;
@@ -19,12 +25,18 @@ mod tests;
 
 mod util;
 
+// close a connection after 300 secs of inactivity
+const CONNECTION_INACTIVITY_TIMEOUT: Duration = Duration::from_secs(300);
+
 type CloseConnection = bool;
 type ReceivedDataLength = usize;
 
 pub struct Server {
     server_state_bus: MPB<ServerState>,
     cluster_options: ServerClusterOptions,
+    run_commands: Box<dyn Fn(&[u8]) -> Vec<u8> + Send + Sync>,
+    run_opcode: Box<dyn Fn(u16, &[u8]) -> Vec<u8> + Send + Sync>,
+    server_thread: Option<JoinHandle<()>>,
 }
 
 #[derive(Debug, Eq, PartialEq, Clone)]
@@ -35,6 +47,16 @@ pub enum ServerState {
     Stopped,
     Timeout,
     Error(String),
+    // stop the server if it is running and release it - sent when the server is dropped
+    Shutdown,
+}
+
+/// address the local RESP server is listening on
+#[derive(Debug, Clone)]
+enum ListenerAddr {
+    Tcp(String),
+    #[cfg(unix)]
+    Unix(PathBuf),
 }
 
 #[derive(Debug)]
@@ -81,21 +103,53 @@ impl Server {
         cluster_options: ServerClusterOptions,
         port: u16,
     ) -> Self {
-        let s = Server {
+        Server::new_with_listener_addr(
+            storage,
+            cluster_options,
+            ListenerAddr::Tcp(format!("0.0.0.0:{}", port)),
+        )
+    }
+
+    /// create a server listening on the Unix domain socket `path` instead of a TCP port
+    #[cfg(unix)]
+    pub fn new_unix<T: Storage + Send + 'static, P: Into<PathBuf>>(storage: T, path: P) -> Self {
+        Server::new_with_listener_addr(
+            storage,
+            ServerClusterOptions::default(),
+            ListenerAddr::Unix(path.into()),
+        )
+    }
+
+    fn new_with_listener_addr<T: Storage + Send + 'static>(
+        storage: T,
+        cluster_options: ServerClusterOptions,
+        listener_addr: ListenerAddr,
+    ) -> Self {
+        let storage = Arc::new(Mutex::new(storage));
+        let embedded_storage = storage.clone();
+        let opcode_storage = storage.clone();
+
+        let mut s = Server {
             server_state_bus: MPB::new(),
             cluster_options,
+            run_commands: Box::new(move |bytes: &[u8]| {
+                run_commands_and_get_reply(&embedded_storage, bytes).1
+            }),
+            run_opcode: Box::new(move |opcode: u16, payload: &[u8]| {
+                run_opcode_and_get_response(&opcode_storage, opcode, payload).reply()
+            }),
+            server_thread: None,
         };
 
-        s._init_configuration(format!("0.0.0.0:{}", port), storage);
+        s.server_thread = Some(s._init_configuration(listener_addr, storage));
         s
     }
 
-    fn _init_configuration<A: Into<String>, T: Storage + Send + 'static>(
+    fn _init_configuration<T: Storage + Send + 'static>(
         &self,
-        addr: A,
-        storage: T,
-    ) {
-        let addr = addr.into();
+        addr: ListenerAddr,
+        storage: Arc<Mutex<T>>,
+    ) -> JoinHandle<()> {
         let state_send = self.server_state_bus.sender();
         let state_recv = self.server_state_bus.receiver();
 
@@ -108,12 +162,16 @@ impl Server {
 
         let mut cluster_node = peer.into_cluster_node();
 
-        let _ = thread::spawn(move || {
+        thread::spawn(move || {
             let addr = addr;
-            let storage = Arc::new(Mutex::new(storage));
 
             loop {
                 if let Ok(server_state) = state_recv.recv() {
+                    if server_state == ServerState::Shutdown {
+                        // release the storage and the state bus
+                        return;
+                    }
+
                     if server_state == ServerState::Start {
                         // start local RESP server
                         start_server(&addr, &state_send, &state_recv, &storage);
@@ -123,7 +181,7 @@ impl Server {
                     }
                 }
             }
-        });
+        })
     }
 
     fn change_state(&self, change_to: ServerState) -> Option<ServerState> {
@@ -135,20 +193,20 @@ impl Server {
             ServerState::Started
             | ServerState::Stopped
             | ServerState::Timeout
-            | ServerState::Error(_) => return None,
+            | ServerState::Error(_)
+            | ServerState::Shutdown => return None,
         };
 
-        let _ = thread::spawn(move || {
-            let _ = thread::sleep(Duration::from_millis(100));
-            let _ = send_state_ch.send(change_to);
-        });
-
-        // wait for changing state
+        // subscribe before asking for the change to not miss the new state
         let receiver = self.server_state_bus.receiver(); // TODO cache receiver to reuse it?
+        let _ = send_state_ch.send(change_to);
 
+        // wait for changing state
         while let Ok(server_state) = receiver.recv_timeout(Duration::from_secs(5)) {
-            if server_state == post_change_to_state {
-                return Some(server_state);
+            match server_state {
+                ServerState::Error(_) => return Some(server_state),
+                _ if server_state == post_change_to_state => return Some(server_state),
+                _ => {}
             }
         }
 
@@ -164,27 +222,140 @@ impl Server {
     pub fn stop(&self) -> Option<ServerState> {
         self.change_state(ServerState::Stop)
     }
+
+    /// run RESP encoded (and possibly pipelined) commands without going through the network
+    pub fn exec(&self, commands: &[u8]) -> Vec<u8> {
+        (self.run_commands)(commands)
+    }
+
+    /// run a binary framed command (see `command::opcode`) without going through the network
+    pub fn call(&self, opcode: u16, payload: &[u8]) -> Vec<u8> {
+        (self.run_opcode)(opcode, payload)
+    }
+}
+
+impl Drop for Server {
+    fn drop(&mut self) {
+        let _ = self.server_state_bus.sender().send(ServerState::Shutdown);
+
+        // wait for the listener to be closed and the storage to be released
+        if let Some(server_thread) = self.server_thread.take() {
+            let _ = server_thread.join();
+        }
+    }
 }
 
 fn start_server<T: Storage + Send + 'static>(
-    addr: &str,
+    addr: &ListenerAddr,
     state_send: &Sender<ServerState>,
     state_recv: &Receiver<ServerState>,
     storage: &Arc<Mutex<T>>,
 ) {
-    let listener = match TcpListener::bind(addr) {
-        Ok(listener) => {
-            // notify that the server has been started
-            let _ = state_send.send(ServerState::Started);
-            let _ = listener.set_nonblocking(true);
-            listener
+    match addr {
+        ListenerAddr::Tcp(addr) => {
+            let listener = match TcpListener::bind(addr) {
+                Ok(listener) => {
+                    // notify that the server has been started
+                    let _ = state_send.send(ServerState::Started);
+                    let _ = listener.set_nonblocking(true);
+                    listener
+                }
+                Err(err) => {
+                    // notify that the server can't be started
+                    let _ = state_send.send(ServerState::Error(err.to_string()));
+                    return;
+                }
+            };
+
+            let incoming = listener.incoming().map(|stream| {
+                stream.map(|tcp_stream| {
+                    // replies are written at once, do not wait to coalesce them
+                    let _ = tcp_stream.set_nodelay(true);
+                    // streams may inherit the non-blocking mode of the listener (e.g. on MacOSX)
+                    let _ = tcp_stream.set_nonblocking(false);
+                    let _ = tcp_stream.set_read_timeout(Some(CONNECTION_INACTIVITY_TIMEOUT));
+                    tcp_stream
+                })
+            });
+
+            listen_incoming(incoming, state_send, state_recv, storage);
         }
-        Err(_) => {
-            thread::sleep(Duration::from_millis(10));
-            return;
+        #[cfg(unix)]
+        ListenerAddr::Unix(path) => {
+            if let Err(err) = remove_stale_socket(path) {
+                // notify that the server can't be started
+                let _ = state_send.send(ServerState::Error(err.to_string()));
+                return;
+            }
+
+            let listener = match UnixListener::bind(path) {
+                Ok(listener) => {
+                    // notify that the server has been started
+                    let _ = state_send.send(ServerState::Started);
+                    let _ = listener.set_nonblocking(true);
+                    listener
+                }
+                Err(err) => {
+                    // notify that the server can't be started
+                    let _ = state_send.send(ServerState::Error(err.to_string()));
+                    return;
+                }
+            };
+
+            let incoming = listener.incoming().map(|stream| {
+                stream.map(|unix_stream| {
+                    let _ = unix_stream.set_nonblocking(false);
+                    let _ = unix_stream.set_read_timeout(Some(CONNECTION_INACTIVITY_TIMEOUT));
+                    unix_stream
+                })
+            });
+
+            listen_incoming(incoming, state_send, state_recv, storage);
+
+            // the socket file is not removed when the listener is closed
+            let _ = std::fs::remove_file(path);
         }
+    }
+}
+
+/// remove the socket file left at `path` by a server which is not running anymore -
+/// anything else at `path` is an error
+#[cfg(unix)]
+fn remove_stale_socket(path: &Path) -> std::io::Result<()> {
+    let metadata = match std::fs::symlink_metadata(path) {
+        Ok(metadata) => metadata,
+        Err(err) if err.kind() == ErrorKind::NotFound => return Ok(()),
+        Err(err) => return Err(err),
     };
 
+    if !metadata.file_type().is_socket() {
+        return Err(std::io::Error::new(
+            ErrorKind::AlreadyExists,
+            format!("{} already exists and is not a socket", path.display()),
+        ));
+    }
+
+    match UnixStream::connect(path) {
+        // nobody listens on the socket anymore
+        Err(err) if err.kind() == ErrorKind::ConnectionRefused => std::fs::remove_file(path),
+        Err(err) => Err(err),
+        Ok(_) => Err(std::io::Error::new(
+            ErrorKind::AddrInUse,
+            format!("{} is already used by another server", path.display()),
+        )),
+    }
+}
+
+fn listen_incoming<T, S, I>(
+    incoming: I,
+    state_send: &Sender<ServerState>,
+    state_recv: &Receiver<ServerState>,
+    storage: &Arc<Mutex<T>>,
+) where
+    T: Storage + Send + 'static,
+    S: Read + Write + Send + 'static,
+    I: Iterator<Item = std::io::Result<S>>,
+{
     let thread_pool = match rayon::ThreadPoolBuilder::new()
         .thread_name(|_| "request handler".to_string())
         .build()
@@ -196,10 +367,10 @@ fn start_server<T: Storage + Send + 'static>(
     };
 
     // listen incoming requests
-    for stream in listener.incoming() {
+    for stream in incoming {
         match stream {
-            Ok(tcp_stream) => {
-                handle_tcp_stream(tcp_stream, &thread_pool, &state_send, &state_recv, &storage);
+            Ok(stream) => {
+                handle_stream(stream, &thread_pool, &state_send, &state_recv, &storage);
             }
             Err(err) if err.kind() == ErrorKind::WouldBlock => {
                 thread::sleep(Duration::from_millis(10));
@@ -216,44 +387,31 @@ fn start_server<T: Storage + Send + 'static>(
     }
 }
 
-fn handle_tcp_stream<T: Storage + Send + 'static>(
-    tcp_stream: TcpStream,
+fn handle_stream<T, S>(
+    stream: S,
     thread_pool: &ThreadPool,
     state_send: &Sender<ServerState>,
     state_recv: &Receiver<ServerState>,
     storage: &Arc<Mutex<T>>,
-) {
+) where
+    T: Storage + Send + 'static,
+    S: Read + Write + Send + 'static,
+{
     let storage = storage.clone();
     let state_recv = state_recv.clone();
     let state_send = state_send.clone();
 
     let _ = thread_pool.spawn(move || {
-        let mut last_update = SystemTime::now();
+        let mut stream = stream;
+        // bytes received on the connection that don't make a complete command yet
+        let mut buffer = Vec::with_capacity(512);
 
         loop {
-            let (close_connection, received_data_length) = handle_request(&storage, &tcp_stream);
-
-            if received_data_length > 0 {
-                // reset the last time we received data
-                last_update = SystemTime::now();
-            } else {
-                // delay the loop
-                thread::sleep(Duration::from_millis(10));
-            }
+            // block until the client sends a request, closes the connection or is inactive for too long
+            let (close_connection, _) = handle_request(&storage, &mut stream, &mut buffer);
 
             if stop_sig_received(&state_recv, &state_send) || close_connection {
-                // let's close the connection
-                return;
-            }
-
-            if let Ok(duration) = last_update.duration_since(SystemTime::now()) {
-                if duration.as_secs() >= 300 {
-                    // close the connection after 300 secs of inactivity
-                    return;
-                }
-            }
-
-            if close_connection {
+                // let's close the connection and release the request handler thread
                 return;
             }
         }
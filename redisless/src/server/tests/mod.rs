@@ -169,6 +169,88 @@ fn expire_and_ttl() {
     assert_eq!(server.stop(), Some(ServerState::Stopped));
 }
 
+#[test]
+#[serial]
+fn pipelined_commands() {
+    let (server, mut con) = get_redis_client_connection(3358);
+
+    for _ in 0..9 {
+        let (n, x, deleted): (u32, String, u32) = redis::pipe()
+            .set("n", 8)
+            .ignore()
+            .incr("n", 1)
+            .set("key", "value")
+            .ignore()
+            .get("key")
+            .del("key")
+            .query(&mut con)
+            .unwrap();
+
+        assert_eq!(n, 9);
+        assert_eq!(x, "value");
+        assert_eq!(deleted, 1);
+    }
+
+    assert_eq!(server.stop(), Some(ServerState::Stopped));
+}
+
+#[test]
+#[serial]
+fn large_pipelined_commands() {
+    let (server, mut con) = get_redis_client_connection(3360);
+
+    // the commands span several reads - some of them are split between two reads
+    let value = "v".repeat(10_000);
+    let mut pipe = redis::pipe();
+    for i in 0..100 {
+        pipe.set(format!("key{}", i), &value).ignore();
+    }
+    let (x, deleted): (String, u32) = pipe.get("key99").del("key0").query(&mut con).unwrap();
+
+    assert_eq!(x, value);
+    assert_eq!(deleted, 1);
+
+    assert_eq!(server.stop(), Some(ServerState::Stopped));
+}
+
+#[cfg(unix)]
+#[test]
+#[serial]
+fn unix_socket() {
+    let server = Server::new_unix(InMemoryStorage::new(), "/tmp/redisless-test.sock");
+    assert_eq!(server.start(), Some(ServerState::Started));
+
+    let redis_client = redis::Client::open("redis+unix:///tmp/redisless-test.sock").unwrap();
+    let mut con = redis_client.get_connection().unwrap();
+
+    let _: () = con.set("key", "value").unwrap();
+    let x: String = con.get("key").unwrap();
+    assert_eq!(x, "value");
+
+    // the socket file can't be taken over while the server is running
+    let other_server = Server::new_unix(InMemoryStorage::new(), "/tmp/redisless-test.sock");
+    assert!(matches!(other_server.start(), Some(ServerState::Error(_))));
+
+    assert_eq!(server.stop(), Some(ServerState::Stopped));
+    // the socket file is removed once the listener has been closed, right after the stop notification
+    sleep(Duration::from_millis(100));
+    assert!(!std::path::Path::new("/tmp/redisless-test.sock").exists());
+}
+
+#[cfg(unix)]
+#[test]
+#[serial]
+fn unix_socket_on_existing_file() {
+    let path = "/tmp/redisless-test.file";
+    std::fs::write(path, "content").unwrap();
+
+    let server = Server::new_unix(InMemoryStorage::new(), path);
+    assert!(matches!(server.start(), Some(ServerState::Error(_))));
+    assert_eq!(std::fs::read_to_string(path).unwrap(), "content");
+
+    std::fs::remove_file(path).unwrap();
+}
+
 #[test]
 #[serial]
 fn get_set() {
@@ -507,6 +589,18 @@ fn start_and_stop_server() {
     assert_eq!(server.stop(), Some(ServerState::Stopped));
 }
 
+#[test]
+#[serial]
+fn start_server_on_used_port() {
+    let server = Server::new(InMemoryStorage::new(), 3359);
+    assert_eq!(server.start(), Some(ServerState::Started));
+
+    let other_server = Server::new(InMemoryStorage::new(), 3359);
+    assert!(matches!(other_server.start(), Some(ServerState::Error(_))));
+
+    assert_eq!(server.stop(), Some(ServerState::Stopped));
+}
+
 #[test]
 fn start_and_stop_server_multiple_times() {
     let server = Server::new(InMemoryStorage::new(), 3341);
@@ -6,91 +6,146 @@ pub use run_command::*;
 use crate::server::ServerState;
 
 use std::{
-    io::{BufReader, Read, Write},
-    net::TcpStream,
+    io::{Read, Write},
     sync::{Arc, Mutex, MutexGuard},
-    thread,
-    time::Duration,
 };
 
 use crate::{
     command::{command_error::RedisCommandError, Command},
-    protocol::{self, parser::RedisProtocolParser, Resp},
+    protocol::{self, error::RedisError, parser::RedisProtocolParser, Resp},
     storage::Storage,
 };
 
 use super::{CloseConnection, ReceivedDataLength};
 
 pub fn lock_then_release<T: Storage>(storage: &Arc<Mutex<T>>) -> MutexGuard<T> {
-    loop {
-        match storage.lock() {
-            Ok(storage) => {
-                return storage;
-            }
-            Err(_) => {
-                thread::sleep(Duration::from_millis(10));
-            }
-        }
-    }
+    // a command which panicked while holding the lock poisons it for good - keep serving the storage
+    storage.lock().unwrap_or_else(|err| err.into_inner())
 }
 
 pub fn stop_sig_received(recv: &Receiver<ServerState>, sender: &Sender<ServerState>) -> bool {
-    if let Ok(recv_state) = recv.try_recv() {
-        if recv_state == ServerState::Stop {
+    match recv.try_recv() {
+        Ok(ServerState::Stop) => {
             // notify that the server has been stopped
             let _ = sender.send(ServerState::Stopped);
-            return true;
+            true
         }
+        Ok(ServerState::Shutdown) => {
+            // the receiver is shared with the request handlers - pass it on to the server thread
+            let _ = sender.send(ServerState::Shutdown);
+            true
+        }
+        _ => false,
     }
+}
 
-    false
+pub fn get_command(bytes: &[u8]) -> Result<Command, RedisCommandError> {
+    get_command_from_resp(RedisProtocolParser::parse(bytes).map(|(resp, _)| resp))
 }
 
-pub fn get_command(bytes: &[u8; 512]) -> Result<Command, RedisCommandError> {
-    match RedisProtocolParser::parse(bytes) {
-        Ok((Resp::Array(v), _)) => match Command::parse(v) {
-            Ok(command) => Ok(command),
-            Err(err) => Err(err),
-        },
+pub fn get_command_from_resp(resp: Result<Resp, RedisError>) -> Result<Command, RedisCommandError> {
+    match resp {
+        Ok(Resp::Array(v)) => Command::parse(v),
         Err(err) => Err(RedisCommandError::ProtocolParse(err)),
         _ => Err(RedisCommandError::CommandNotFound),
     }
 }
 
-fn get_bytes_from_request(stream: &TcpStream) -> ([u8; 512], usize) {
-    let mut buf_reader = BufReader::new(stream);
-    let mut buf = [0; 512];
-    let mut buf_length = 0_usize;
+/// max size of the bytes buffered for a connection while waiting for the end of a command
+const MAX_BUFFERED_REQUEST_SIZE: usize = 512 * 1024 * 1024;
 
-    while let Ok(s) = buf_reader.read(&mut buf) {
-        buf_length += s;
+/// read the next bytes sent on `stream` into `buffer`, then run and reply to the commands completed by them -
+/// an incomplete command stays in `buffer` until the rest of it is received
+pub fn handle_request<T: Storage, S: Read + Write>(
+    storage: &Arc<Mutex<T>>,
+    stream: &mut S,
+    buffer: &mut Vec<u8>,
+) -> (CloseConnection, ReceivedDataLength) {
+    let mut buf = [0; 4096];
+    // read straight from the stream - a BufReader would drop what it buffered past `buf`
+    let buf_length = stream.read(&mut buf).unwrap_or(0);
 
-        if s < 512 {
-            break;
-        }
+    if buf_length == 0 {
+        // the connection has been closed by the client, timed out or failed
+        return (true, 0);
+    }
+
+    buffer.extend_from_slice(&buf[..buf_length]);
+
+    let (quit, reply, parsed_length) = run_complete_commands_and_get_reply(storage, buffer);
+    buffer.drain(..parsed_length);
+
+    if !reply.is_empty() && stream.write_all(&reply).is_err() {
+        return (true, buf_length);
     }
 
-    (buf, buf_length)
+    // don't let a client grow the buffer forever with a command that never ends
+    (quit || buffer.len() > MAX_BUFFERED_REQUEST_SIZE, buf_length)
 }
 
-pub fn handle_request<T: Storage>(
+/// run all the commands contained in `bytes` and return their concatenated replies
+pub fn run_commands_and_get_reply<T: Storage>(
     storage: &Arc<Mutex<T>>,
-    mut stream: &TcpStream,
-) -> (CloseConnection, ReceivedDataLength) {
-    let (buf, buf_length) = get_bytes_from_request(stream);
+    bytes: &[u8],
+) -> (CloseConnection, Vec<u8>) {
+    let (quit, mut reply, parsed_length) = run_complete_commands_and_get_reply(storage, bytes);
+
+    if !quit && parsed_length < bytes.len() {
+        // nothing else is coming - let the command parser reply with the appropriate error
+        let res = run_command_and_get_response(storage, &bytes[parsed_length..]);
+        let quit = res.is_quit();
+        reply.append(&mut res.reply());
+        return (quit, reply);
+    }
 
-    match buf.get(0) {
-        Some(x) if *x == 0 => {
-            return (false, buf_length);
+    (quit, reply)
+}
+
+/// run the complete commands contained in `bytes` and return their concatenated replies
+/// with the number of bytes they span
+fn run_complete_commands_and_get_reply<T: Storage>(
+    storage: &Arc<Mutex<T>>,
+    bytes: &[u8],
+) -> (CloseConnection, Vec<u8>, usize) {
+    let mut quit = false;
+    let mut reply = Vec::<u8>::with_capacity(512);
+    let mut parsed_length = 0;
+
+    // a client can pipeline several commands in a single request
+    for (resp, resp_length) in split_commands(bytes) {
+        let res = run_resp_and_get_response(storage, resp);
+        quit = res.is_quit();
+        reply.append(&mut res.reply());
+        parsed_length += resp_length;
+
+        if quit {
+            break;
         }
-        _ => {}
     }
 
-    let res = run_command_and_get_response(storage, &buf);
-    let quit = if res.is_quit() { true } else { false };
-    let reply = res.reply();
-    //eprintln!("?{}", std::str::from_utf8(&reply).unwrap());
-    let _ = stream.write(&reply);
+    (quit, reply, parsed_length)
+}
+
+/// parse the RESP commands of a request, each with the number of bytes it spans - an incomplete
+/// command at the end of the bytes is left out
+fn split_commands(bytes: &[u8]) -> Vec<(Result<Resp, RedisError>, usize)> {
+    let mut commands = vec![];
+    let mut left = bytes;
+
+    while !left.is_empty() {
+        match RedisProtocolParser::parse(left) {
+            Ok((resp, next)) => {
+                commands.push((Ok(resp), left.len() - next.len()));
+                left = next;
+            }
+            Err(err) if err.is_incomplete() => break,
+            Err(err) => {
+                // let the command parser reply with the appropriate error
+                commands.push((Err(err), left.len()));
+                break;
+            }
+        }
+    }
 
-    (quit, 1)
+    commands
 }
@@ -15,10 +15,31 @@ use super::*;
 
 pub fn run_command_and_get_response<T: Storage>(
     storage: &Arc<Mutex<T>>,
-    bytes: &[u8; 512],
+    bytes: &[u8],
+) -> RedisResponse {
+    run_command(storage, get_command(bytes))
+}
+
+pub fn run_resp_and_get_response<T: Storage>(
+    storage: &Arc<Mutex<T>>,
+    resp: Result<Resp, RedisError>,
+) -> RedisResponse {
+    run_command(storage, get_command_from_resp(resp))
+}
+
+pub fn run_opcode_and_get_response<T: Storage>(
+    storage: &Arc<Mutex<T>>,
+    opcode: u16,
+    payload: &[u8],
+) -> RedisResponse {
+    run_command(storage, Command::from_opcode(opcode, payload))
+}
+
+fn run_command<T: Storage>(
+    storage: &Arc<Mutex<T>>,
+    command: Result<Command, RedisCommandError>,
 ) -> RedisResponse {
     use protocol::response::RedisResponseType::*;
-    let command = get_command(bytes);
     let response = match command {
         Ok(command) => match command {
             Command::Set(k, v) => {
@@ -72,14 +93,14 @@ pub fn run_command_and_get_response<T: Storage>(
                 RedisResponse::single(Integer(e as i64))
             }
             Command::Get(k) => match lock_then_release(storage).read(k.as_slice()) {
-                Some(value) => RedisResponse::single(SimpleString(value.to_vec())),
+                Some(value) => RedisResponse::single(BulkString(value.to_vec())),
                 None => RedisResponse::single(Nil),
             },
             Command::GetSet(k, v) => {
                 let mut storage = lock_then_release(storage);
 
                 let response = match storage.read(k.as_slice()) {
-                    Some(value) => RedisResponse::single(SimpleString(value.to_vec())),
+                    Some(value) => RedisResponse::single(BulkString(value.to_vec())),
                     None => RedisResponse::single(Nil),
                 };
                 storage.write(k.as_slice(), v.as_slice());
@@ -90,7 +111,7 @@ pub fn run_command_and_get_response<T: Storage>(
                 let mut responses = Vec::<RedisResponseType>::with_capacity(keys.len());
                 for key in keys {
                     let response = match storage.read(key.as_slice()) {
-                        Some(value) => RedisResponseType::SimpleString(value.to_vec()),
+                        Some(value) => RedisResponseType::BulkString(value.to_vec()),
                         None => RedisResponseType::Nil,
                     };
                     responses.push(response);
@@ -110,7 +131,7 @@ pub fn run_command_and_get_response<T: Storage>(
             }
             Command::HGet(map_key, field_key) => {
                 match lock_then_release(storage).hread(map_key.as_slice(), field_key.as_slice()) {
-                    Some(value) => RedisResponse::single(SimpleString(value.to_vec())),
+                    Some(value) => RedisResponse::single(BulkString(value.to_vec())),
                     None => RedisResponse::single(Nil),
                 }
             }
@@ -280,7 +301,7 @@ pub fn run_command_and_get_response<T: Storage>(
                     return RedisResponse::single(Nil);
                 }
                 match values.get(index as usize) {
-                    Some(value) => RedisResponse::single(SimpleString(value.to_vec())),
+                    Some(value) => RedisResponse::single(BulkString(value.to_vec())),
                     None => RedisResponse::single(Nil),
                 }
             }
@@ -508,15 +529,17 @@ pub fn run_command_and_get_response<T: Storage>(
 
                 match storage.read(k.as_slice()) {
                     Some(value) => {
-                        if let Ok(mut int_val) = std::str::from_utf8(value).unwrap().parse::<i64>()
+                        match std::str::from_utf8(value)
+                            .ok()
+                            .and_then(|value| value.parse::<i64>().ok())
+                            .and_then(|int_val| int_val.checked_add(1))
                         {
-                            int_val += 1;
-                            let new_value = int_val.to_string().into_bytes();
-                            storage.write(k.as_slice(), new_value.as_slice());
-                            RedisResponse::single(Integer(int_val as i64))
-                        } else {
-                            // handle this error
-                            unimplemented!()
+                            Some(int_val) => {
+                                let new_value = int_val.to_string().into_bytes();
+                                storage.write(k.as_slice(), new_value.as_slice());
+                                RedisResponse::single(Integer(int_val))
+                            }
+                            None => RedisResponse::error(RedisCommandError::NotAnInteger),
                         }
                     }
                     None => {
@@ -531,15 +554,17 @@ pub fn run_command_and_get_response<T: Storage>(
 
                 match storage.read(k.as_slice()) {
                     Some(value) => {
-                        if let Ok(mut int_val) = std::str::from_utf8(value).unwrap().parse::<i64>()
+                        match std::str::from_utf8(value)
+                            .ok()
+                            .and_then(|value| value.parse::<i64>().ok())
+                            .and_then(|int_val| int_val.checked_add(increment))
                         {
-                            int_val += increment;
-                            let new_value = int_val.to_string().into_bytes();
-                            storage.write(k.as_slice(), new_value.as_slice());
-                            RedisResponse::single(Integer(int_val as i64))
-                        } else {
-                            //RedisResponse::error(...)
-                            unimplemented!()
+                            Some(int_val) => {
+                                let new_value = int_val.to_string().into_bytes();
+                                storage.write(k.as_slice(), new_value.as_slice());
+                                RedisResponse::single(Integer(int_val))
+                            }
+                            None => RedisResponse::error(RedisCommandError::NotAnInteger),
                         }
                     }
                     None => {
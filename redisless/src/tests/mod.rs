@@ -1,10 +1,19 @@
 use std::io::{Read, Write};
 use std::net::TcpStream;
 
+use crate::command::opcode;
 use crate::{
-    redisless_server_free, redisless_server_new, redisless_server_start, redisless_server_stop,
+    redisless_reply_free, redisless_server_call, redisless_server_exec, redisless_server_free,
+    redisless_server_new, redisless_server_start, redisless_server_stop,
 };
 
+/// copy a reply returned by the lib and release it
+unsafe fn take_reply(reply: *mut u8, reply_length: usize) -> Vec<u8> {
+    let res = std::slice::from_raw_parts(reply, reply_length).to_vec();
+    redisless_reply_free(reply, reply_length);
+    res
+}
+
 #[test]
 #[serial]
 fn start_and_stop_server_from_c_binding() {
@@ -32,9 +41,9 @@ fn start_and_stop_server_from_c_binding() {
 
         // run command `GET mykey`
         let _ = stream.write(b"*2\r\n$3\r\nGET\r\n$5\r\nmykey\r\n");
-        let mut get_res = [0; 8];
+        let mut get_res = [0; 11];
         let _ = stream.read(&mut get_res);
-        assert_eq!(get_res, b"+value\r\n"[..]);
+        assert_eq!(get_res, b"$5\r\nvalue\r\n"[..]);
 
         // run command `DEL mykey`
         let _ = stream.write(b"*2\r\n$3\r\nDEL\r\n$5\r\nmykey\r\n");
@@ -54,3 +63,133 @@ fn start_and_stop_server_from_c_binding() {
         redisless_server_free(server);
     }
 }
+
+#[test]
+#[serial]
+fn exec_commands_from_c_binding() {
+    let port = 4445 as u16;
+    let server = unsafe { redisless_server_new(port) };
+
+    // run commands `SET mykey value`, `GET mykey` and `DEL mykey` in one call
+    let commands =
+        b"*3\r\n$3\r\nSET\r\n$5\r\nmykey\r\n$5\r\nvalue\r\n*2\r\n$3\r\nGET\r\n$5\r\nmykey\r\n*2\r\n$3\r\nDEL\r\n$5\r\nmykey\r\n";
+    let mut reply = std::ptr::null_mut();
+
+    let reply = unsafe {
+        let reply_length =
+            redisless_server_exec(server, commands.as_ptr(), commands.len(), &mut reply);
+        take_reply(reply, reply_length)
+    };
+
+    assert_eq!(reply, b"+OK\r\n$5\r\nvalue\r\n:1\r\n");
+
+    unsafe {
+        redisless_server_free(server);
+    }
+}
+
+#[test]
+#[serial]
+fn call_opcodes_from_c_binding() {
+    let port = 4446 as u16;
+    let server = unsafe { redisless_server_new(port) };
+
+    let calls: [(u16, &[u8], &[u8]); 3] = [
+        (
+            opcode::SET,
+            b"\x05\x00mykey\x05\x00\x00\x00value",
+            b"+OK\r\n",
+        ),
+        (opcode::GET, b"\x05\x00mykey", b"$5\r\nvalue\r\n"),
+        (opcode::DEL, b"\x05\x00mykey", b":1\r\n"),
+    ];
+
+    for (command_opcode, payload, expected_reply) in calls.iter() {
+        let mut reply = std::ptr::null_mut();
+
+        let reply = unsafe {
+            let reply_length = redisless_server_call(
+                server,
+                *command_opcode,
+                payload.as_ptr(),
+                payload.len(),
+                &mut reply,
+            );
+            take_reply(reply, reply_length)
+        };
+
+        assert_eq!(reply, *expected_reply);
+    }
+
+    unsafe {
+        redisless_server_free(server);
+    }
+}
+
+#[test]
+#[serial]
+fn free_started_server_from_c_binding() {
+    let port = 4447 as u16;
+
+    for _ in 0..3 {
+        // freeing a running server must release its port
+        let server = unsafe { redisless_server_new(port) };
+
+        unsafe {
+            assert!(redisless_server_start(server), "server didn't start");
+            redisless_server_free(server);
+        }
+    }
+}
+
+#[test]
+#[serial]
+fn incr_text_from_c_binding() {
+    let port = 4448 as u16;
+    let server = unsafe { redisless_server_new(port) };
+
+    let calls: [(u16, &[u8], &[u8]); 4] = [
+        (
+            opcode::SET,
+            b"\x05\x00mykey\x05\x00\x00\x00value",
+            b"+OK\r\n",
+        ),
+        (
+            opcode::INCR,
+            b"\x05\x00mykey",
+            b"-ERR value is not an integer or out of range\r\n",
+        ),
+        // not a UTF-8 value
+        (
+            opcode::SET,
+            b"\x05\x00mykey\x01\x00\x00\x00\xff",
+            b"+OK\r\n",
+        ),
+        (
+            opcode::DECR,
+            b"\x05\x00mykey",
+            b"-ERR value is not an integer or out of range\r\n",
+        ),
+    ];
+
+    for (command_opcode, payload, expected_reply) in calls.iter() {
+        let mut reply = std::ptr::null_mut();
+
+        let reply = unsafe {
+            let reply_length = redisless_server_call(
+                server,
+                *command_opcode,
+                payload.as_ptr(),
+                payload.len(),
+                &mut reply,
+            );
+            take_reply(reply, reply_length)
+        };
+
+        assert_eq!(reply, *expected_reply);
+    }
+
+    unsafe {
+        redisless_server_free(server);
+    }
+}